@@ -7,22 +7,42 @@ __prog__ = 'hash.py'
 __purpose__ = 'Calculate hash codes for files.'
 __version__ = '2.0.2'
 __version_date__ = '2021-12-25'
-__version_info__ = tuple(int(i) for i in __version__.split('.') if i.isdigit())
+__version_info__ = tuple(map(int, __version__.split('.')))
 
 
 import argparse
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
-from functools import wraps
+from functools import partial
 import hashlib
-from math import ceil
+from math import log10
+import mmap
 import os
-import platform
+import queue
+import re
 import sys
-from time import perf_counter
-# constant 1k multiplier for args.blocksize
-BLOCK_SIZE_FACTOR = 1000
+import threading
+from time import localtime, perf_counter, perf_counter_ns, strftime, time
+try:
+    import blake3        # optional: pip install blake3
+except ImportError:
+    blake3 = None
+# constant 1KiB multiplier for args.blocksize
+BLOCK_SIZE_FACTOR = 1024
+# files this size and larger are memory mapped instead of read
+MMAP_MIN_SIZE = 10 * 1024 * 1024
 START_PROG_TIME = perf_counter()
+# runs of digits that bp colorizes
+DIGIT_RE = re.compile(r'\d+')
+# byte_notation units, each 1000x the last: single, double, full word
+BYTE_UNITS = (
+    ('B', 'B', 'bytes'),
+    ('k', 'kB', 'kilobytes'),
+    ('M', 'MB', 'megabytes'),
+    ('G', 'GB', 'gigabytes'),
+    ('T', 'TB', 'terabytes'),
+)
 
 
 # ~~~ #                 -global variables-
@@ -39,8 +59,18 @@ bp_dict = {
     'quiet': 0,                 # allows surpressing cli errors
     'verbose': 0,               # match this verbose to bp veb; skip if lower
 }
+# open log file handles keyed on path, kept for the life of the program
+bp_log_handles = {}
+# the second and its formatted [H:M:S] stamp, reused within the same second
+bp_time_cache = [0, '']
 ver = f'{__prog__} v{__version__} ({__version_date__})'
 hash_list = sorted(hashlib.algorithms_guaranteed)
+if blake3:
+    hash_list = sorted(hash_list + ['blake3'])
+# variable length (XOF) hashes, whose digest size comes from --length
+XOF_HASHES = frozenset(
+    h for h in hash_list if h.startswith('shake') or h == 'blake3'
+)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -60,6 +90,27 @@ class ColorText:                                        # from betterprint 0.3.2
     )
 
 
+# ~~~ #                 -class variables-
+# built at import so module level tables below can use the colors
+Ct = ColorText()
+Ct.a = '\u001b[0m'
+Ct.red = '\u001b[38;5;1m'
+Ct.green = '\u001b[38;5;2m'
+Ct.yellow = '\u001b[38;5;3m'
+Ct.bblue = '\u001b[38;5;12m'
+Ct.bmagenta = '\u001b[38;5;13m'
+Ct.grey1 = '\u001b[38;5;255m'
+Ct.orange = '\u001b[38;2;233;133;33m'
+# color only goes to a terminal, and never when NO_COLOR is set (no-color.org)
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for color in ColorText.__slots__:
+        setattr(Ct, color, '')
+    bp_dict['color'] = 0
+# bp line prefixes indexed by bp err: none, WARNING, ERROR
+BP_ERR_CON = ('', f'{Ct.yellow}WARNING: {Ct.a}', f'{Ct.red}ERROR: {Ct.a}')
+BP_ERR_FILE = ('', 'WARNING: ', 'ERROR: ')
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 def bp(txt: list, con=1, err=0, fil=1, fls=0, inl=0, log=1, num=1, veb=0):
     """Better Print: send output commands here instead of using print command.
@@ -102,20 +153,17 @@ def bp(txt: list, con=1, err=0, fil=1, fls=0, inl=0, log=1, num=1, veb=0):
     Return:
         - None
     """
-    # ~~~ #             -variables-
-    global bp_dict
-    bp_local_dict = {
-        'con_out': '',
-        'file_out': '',
-    }
-
     # ~~~ #             -all print tracking-
     # track function call even if no output
+    global bp_dict
     bp_dict['bp_tracker_all'] += 1
 
     # ~~~ #             -validate verbosity-
-    if (err == 0 or bp_dict['quiet'] == 1) and bp_dict['verbose'] < veb:
+    # checked before any other work so skipped calls return right away
+    if bp_dict['verbose'] < veb and (err == 0 or bp_dict['quiet'] == 1):
         return      # skip higher veb as long as no errors or in quiet mode
+    if con == 0 and fil == 0:
+        return      # nowhere to send the output
 
     # ~~~ #             -validate txt list-
     # ensure each string has a color compliment within the list
@@ -125,22 +173,32 @@ def bp(txt: list, con=1, err=0, fil=1, fls=0, inl=0, log=1, num=1, veb=0):
             f'"must be in pairs (txt length = {len(txt)}){Ct.a}',
         )
 
-    # ~~~ #             -veb-
-    # prepend INFO-L(x) to output
-    if veb > 0 and err == 0 and log > 0:
-        bp_local_dict['con_out'] = f'INFO-L{veb}: '
-        bp_local_dict['file_out'] = f'INFO-L{veb}: '
-
-    # ~~~ #             -err-
-    # pre-pend Error or Warning, overwriting -veb- section
-    if err == 1:
-        bp_local_dict['con_out'] = f'{Ct.yellow}WARNING: {Ct.a}'
-        bp_local_dict['file_out'] = 'WARNING: '
-    elif err == 2:
-        bp_local_dict['con_out'] = f'{Ct.red}ERROR: {Ct.a}'
-        bp_local_dict['file_out'] = 'ERROR: '
+    # ~~~ #             -variables-
+    # output is collected in parts and joined once at the end
+    con_parts = []
+    file_parts = []
+
+    # ~~~ #             -log-
+    # allow log=0 to bypass this; the date leads the line
+    if bp_dict['date_log'] == 1 and log == 1:
+        now = int(time())
+        if now != bp_time_cache[0]:
+            bp_time_cache[0] = now
+            bp_time_cache[1] = strftime('[%H:%M:%S]', localtime(now))
+        dt_now = bp_time_cache[1]
+        con_parts.append(f'{dt_now}-{bp_dict["bp_tracker_con"] + 1}-')
+        file_parts.append(f'{dt_now}-{bp_dict["bp_tracker_log"] + 1}-')
+
+    # ~~~ #             -veb & err-
+    # pre-pend Error or Warning by err index, or INFO-L(x) for verbose output
+    info = f'INFO-L{veb}: ' if veb > 0 and log > 0 else ''
+    con_parts.append(BP_ERR_CON[err] or info)
+    file_parts.append(BP_ERR_FILE[err] or info)
 
     # ~~~ #             -colorize and assemble-
+    # colors are bound locally once rather than looked up on Ct per part
+    ct_a, ct_bblue = Ct.a, Ct.bblue
+    color = bp_dict['color'] == 1
     # need enumerate to identify even entries that contain strings
     for idx, val in enumerate(txt):
         if idx % 2 == 0:
@@ -149,63 +207,51 @@ def bp(txt: list, con=1, err=0, fil=1, fls=0, inl=0, log=1, num=1, veb=0):
                     f'{Ct.red}"Better Print" (bp) function -> "txt list even '
                     f'entries must be str. txt type = {type(val)}{Ct.a}',
                 )
-            ttxt = ''               # even text val to be joined
+            # file output is the original value with no console coloration
+            file_parts.append(val)
+            if not color:
+                continue    # console gets the file text, so skip the colors
             ctxt = txt[idx + 1]     # odd color val to color ttxt
-            # colorize numbers and reset to default
-            if num == 1 and ctxt == Ct.a:
-                for idx in val[:]:
-                    ttxt += f'{Ct.bblue}{idx}{Ct.a}' if idx.isdigit() else idx
-            # colorize numbers and reset to requested color for that part
-            elif num == 1:
-                for idx in val[:]:
-                    ttxt += f'{Ct.bblue}{idx}{ctxt}' if idx.isdigit() else idx
+            # colorize each run of numbers and reset to the part's color; a
+            # template keeps the substitution in C with no python callback
+            if num == 1:
+                ttxt = DIGIT_RE.sub(f'{ct_bblue}\\g<0>{ctxt}', val)
             # don't colorize numbers (equivalent to num=0)
             else:
                 ttxt = val
             # now wrap the color numbered string with the requested color
-            bp_local_dict['con_out'] += f'{ctxt}{ttxt}{Ct.a}'
-            # file output is the original value with no console coloration
-            bp_local_dict['file_out'] += val[:]
-
-    # ~~~ #             -log-
-    # allow log=0 to bypass this
-    if bp_dict['date_log'] == 1 and log == 1:
-        dt_now = datetime.now().strftime('[%H:%M:%S]')
-        bp_local_dict['con_out'] = (
-            f'{dt_now}-{bp_dict["bp_tracker_con"] + 1}-{bp_local_dict["con_out"]}'
-        )
-        bp_local_dict['file_out'] = (
-            f'{dt_now}-{bp_dict["bp_tracker_log"] + 1}-{bp_local_dict["file_out"]}'
-        )
+            con_parts.append(f'{ctxt}{ttxt}{ct_a}')
+    file_out = ''.join(file_parts)
 
     # ~~~ #             -color-
     # after all colorization sections, set cli to file if no color desired
-    if bp_dict['color'] == 0:
-        bp_local_dict['con_out'] = bp_local_dict['file_out'][:]
+    con_out = ''.join(con_parts) if color else file_out
 
     # ~~~ #             -con-
     # skips con output if con=0
     if inl == 0 and con == 1:                   # default with new line
-        sys.stdout.write(f'{bp_local_dict["con_out"]}\n')
+        con_write(f'{con_out}\n')
         bp_dict['bp_tracker_con'] += 1
     elif inl == 1 and fls == 0 and con == 1:    # in-line with no flush
-        sys.stdout.write(bp_local_dict['con_out'])
+        con_write(con_out)
         bp_dict['bp_tracker_con'] += 1
     elif inl == 1 and fls == 1 and con == 1:    # in-line with flush
         bp_dict['bp_tracker_con'] += 1
-        sys.stdout.write(bp_local_dict['con_out'])
-        sys.stdout.flush()
+        con_write(con_out, flush=True)
 
     # ~~~ #             -file-
     try:
         # skip if file loging not requested or fil=0
         if bp_dict['log_file'] and fil == 1:
-            with open(bp_dict['log_file'], 'a') as f:
-                f.write(bp_local_dict['file_out'] + '\n')
+            f = bp_log_handle(bp_dict['log_file'])
+            f.write(file_out + '\n')
+            if err > 0:     # get errors to disk in case of a crash
+                f.flush()
         # separate errors into dedicated error log
         if bp_dict['error_log_file'] and err > 0 and fil == 1:
-            with open(bp_dict['error_log_file'], 'a') as f:
-                f.write(bp_local_dict['file_out'] + '\n')
+            f = bp_log_handle(bp_dict['error_log_file'])
+            f.write(file_out + '\n')
+            f.flush()
     except OSError as e:
         bp([f'exception caught trying to write to {bp_dict["log_file"]} '
             f'or {bp_dict["error_log_file"]}\n\t{e}', Ct.red], err=1, fil=0)
@@ -214,42 +260,137 @@ def bp(txt: list, con=1, err=0, fil=1, fls=0, inl=0, log=1, num=1, veb=0):
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-def perf_timer(func):
-    """The decorator time function. This is the encapsulating timer
-        functionthat takes one argument, the child function, to calculate the
-        duration of time.
+def bp_log_handle(path: str):
+    """Get the append handle for a bp log file, opening it on first use. The
+    handles stay open so each bp call is a buffered write instead of an
+    open and close. They are closed at exit.
 
     - Args:
-        - child_function ([function]): the child function to execute
+        - path (str): the log file name
 
-    - Return:
-        - wrapper_function: tuple
-            - 0: child function name
-            - 1: duration the time function ran using time.monotonic
-            - 2: the child function return
+    - Returns:
+        - [file]: the open log file
     """
-    # ~~~ #             -timer-
-    # using functools.wraps to pass along the child_function details
-    @wraps(func)
-    def wrapper_function(*args, **kwargs):
-        """The decorator time function. This is the timer function
-         that takes one argument, the child function, to calculate the
-         duration of time.
+    if path not in bp_log_handles:
+        if not bp_log_handles:
+            atexit.register(bp_log_close)
+        bp_log_handles[path] = open(path, 'a', buffering=65536)
+    return bp_log_handles[path]
 
-        - Args:
-            - child_function ([function]): the child function to execute
 
-        - Return:
-            - wrapper_function: tuple
-                - 0: child function name
-                - 1: duration the time function ran using time.perf_counter
-                - 2: the child function return
-        """
-        t_start = perf_counter()
-        return_var = func(*args, **kwargs)
-        t_stop = perf_counter()
-        return func.__name__, t_stop - t_start, return_var
-    return wrapper_function
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def bp_log_close():
+    """Close every open bp log file handle."""
+    for f in bp_log_handles.values():
+        f.close()
+    bp_log_handles.clear()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def con_write(text: str, flush=False):
+    """Write console output as bytes straight to the stdout buffer, which
+    skips the text layer's per write encoder and newline handling. Streams
+    without a buffer (IDLE and other replaced stdouts) get a normal write.
+
+    - Args:
+        - text (str): the text to write
+        - flush (bool, optional): flush after writing. Defaults to False.
+    """
+    out = getattr(sys.stdout, 'buffer', None)
+    if out is None:
+        sys.stdout.write(text)
+        if flush:
+            sys.stdout.flush()
+        return
+    out.write(text.encode(sys.stdout.encoding or 'utf-8', 'replace'))
+    if flush:
+        out.flush()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def cpu_has_sha_ni():
+    """Check if the CPU advertises the SHA extensions (SHA-NI). OpenSSL
+    uses them for sha1/sha224/sha256 when present, which is several times
+    faster than the scalar code.
+
+    - Returns:
+        - [bool/None]: True or False on Linux; None if it cannot be checked
+    """
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return 'sha_ni' in line.split()
+    except OSError:
+        pass
+    return None
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def default_blocksize():
+    """Size the reads from the L2 cache. A quarter of it leaves room for the
+    hash state and the block being read next, while blocks far past the
+    cache only add TLB misses. This is clamped to 256-1024 KiB and falls
+    back to 1024 when the cache size is unknown.
+
+    - Returns:
+        - [int]: the number of 1KiB blocks to read at a time
+    """
+    l2_size = 0
+    if 'SC_LEVEL2_CACHE_SIZE' in getattr(os, 'sysconf_names', {}):
+        try:
+            l2_size = os.sysconf('SC_LEVEL2_CACHE_SIZE')
+        except (OSError, ValueError):
+            pass
+    if l2_size <= 0:
+        # linux lists the caches in sysfs, with the L2 normally at index2
+        try:
+            with open('/sys/devices/system/cpu/cpu0/cache/index2/size') as f:
+                size = f.read().strip()
+            unit = {'K': 1024, 'M': 1024 * 1024}.get(size[-1:].upper(), 1)
+            l2_size = int(size.rstrip('KkMm')) * unit
+        except (OSError, ValueError):
+            pass
+    if l2_size <= 0:
+        return 1024
+    return max(256, min(1024, l2_size // 4 // BLOCK_SIZE_FACTOR))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def file_advise(fd: int, advice: str):
+    """Give the kernel an access pattern hint for a whole open file. It is
+    only a hint, so platforms without posix_fadvise (or the named advice)
+    simply skip it.
+
+    - Args:
+        - fd (int): the open file descriptor
+        - advice (str): the os.POSIX_FADV_* constant name
+    """
+    if hasattr(os, 'posix_fadvise') and hasattr(os, advice):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def new_hash(name: str):
+    """Construct a new hashlib object. All hash construction goes through
+    here so there is one place to choose the backend for an algorithm. The
+    optional blake3 hash is allowed to use every core on one file.
+
+    - Args:
+        - name (str): the hash algorithm name
+
+    - Returns:
+        - [hashlib]: a new hash object for the algorithm
+    """
+    if name == 'blake3':
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    if sys.version_info >= (3, 9):
+        # file checksums aren't a security use, so skip any FIPS gating
+        return hashlib.new(name, usedforsecurity=False)
+    return hashlib.new(name)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -277,7 +418,8 @@ def get_args():
     )
     parser.add_argument(
         '--hash',
-        help='hash type to use; ignored if all is used',
+        help='hash type to use; ignored if all is used'
+             + ('; blake3 is the fastest for large files' if blake3 else ''),
         metavar=f'{Ct.yellow}<hash>{Ct.a}',
         type=str,
         default='sha256',
@@ -285,7 +427,7 @@ def get_args():
     parser.add_argument(
         '-l',
         '--length',
-        help='"shake" hash requires digest length value (1-128)',
+        help='"shake" and "blake3" hashes use this digest length (1-128)',
         metavar=f'{Ct.yellow}<number>{Ct.a}',
         type=int,
         default=32,
@@ -303,11 +445,14 @@ def get_args():
     parser.add_argument(
         '-b',
         '--blocksize',
-        help='specify number of 1kB read blocks (1-1000000);consumes more ram for '
-             'minimally faster processing',
+        help='specify number of 1KiB read blocks (1-1000000); defaults to a '
+             'quarter of the L2 cache (256-1024); values below 64 give up '
+             'throughput while larger values consume more ram; not used for a '
+             'single hash of a file under 10MiB, or larger without -v, which '
+             'are hashed in one pass',
         metavar=f'{Ct.yellow}<number>{Ct.a}',
         type=int,
-        default=16,
+        default=default_blocksize(),
     )
     parser.add_argument(
         '-c',
@@ -356,16 +501,12 @@ def validate_and_process_args(hash_list: list):
         bp(['Available:\nHash:\t\tBlock size:\tDigest Length:\tHex Length:',
             Ct.a])
         for i in hash_list:
-            if 'shake' not in i:
-                bp([f'{i:<16s}', Ct.red,
-                    f'{getattr(hashlib, i)().block_size:<16}'
-                    f'{getattr(hashlib, i)().digest_size:<16}'
-                    f'{2 * getattr(hashlib, i)().digest_size:<16}', Ct.bblue],
-                    num=0)
-            else:
-                bp([f'{i:<16s}', Ct.red,
-                    f'{getattr(hashlib, i)().block_size:<16}{args.length:<16}'
-                    f'{2 * args.length:<16}', Ct.bblue], num=0)
+            # construct each hash once and read all of its values from it
+            h = new_hash(i)
+            digest_size = args.length if i in XOF_HASHES else h.digest_size
+            bp([f'{i:<16s}', Ct.red,
+                f'{h.block_size:<16}{digest_size:<16}{2 * digest_size:<16}',
+                Ct.bblue], num=0)
         sys.exit(0)
 
     # ~~~ #                 -file-
@@ -390,6 +531,28 @@ def validate_and_process_args(hash_list: list):
     if args.compare and args.all:
         bp(['cannot combine "--compare" with "--all".', Ct.red], err=2)
         sys.exit(1)
+    if args.compare:
+        # a value of the wrong length can never match, so skip the hashing
+        h = hash_list[0]
+        hex_len = 2 * (
+            args.length if h in XOF_HASHES else new_hash(h).digest_size
+        )
+        if len(args.compare) != hex_len:
+            bp([f'"--compare" value is {len(args.compare)} characters but '
+                f'{h} output is {hex_len} characters.\n', Ct.a,
+                'HASHES DO NOT MATCH!!', Ct.red])
+            sys.exit(1)
+
+    # ~~~ #                 -sha-ni-
+    # the cpu sha extensions are only used through the OpenSSL backend; the
+    # cpuinfo read only happens when hashlib isn't built on OpenSSL
+    if ({'sha1', 'sha224', 'sha256'}.intersection(hash_list)
+            and not hashlib.sha256.__name__.startswith('openssl_')
+            and cpu_has_sha_ni()):
+        bp(['the cpu supports SHA-NI but python\'s hashlib is not built on '
+            'OpenSSL, so sha1/sha224/sha256 will run several times slower. '
+            'A python linked against OpenSSL 1.1.1 or newer uses it.',
+            Ct.yellow], err=1)
 
     return hash_list
 
@@ -408,71 +571,178 @@ def byte_notation(size: int, acc=2, ntn=0):
     - Returns:
         - [tuple]: 0 = original size int unmodified; 1 = string for printing
     """
-    size_dict = {
-        1: ['B', 'B', 'bytes'],
-        1000: ['k', 'kB', 'kilobytes'],
-        1000000: ['M', 'MB', 'megabytes'],
-        1000000000: ['G', 'GB', 'gigabytes'],
-        1000000000000: ['T', 'TB', 'terabytes'],
-    }
-    return_size_str = ''
-    for key, value in size_dict.items():
-        if (size / key) < 1000:
-            return_size_str = f'{size / key:,.{acc}f} {value[ntn]}'
-            return size, return_size_str
+    # each unit is 1000x the last, so log base 1000 of the size is the index
+    unit = (
+        0
+        if size < 1000
+        else min(len(BYTE_UNITS) - 1, int(log10(size) // 3))
+    )
+    return_size_str = f'{size / 1000 ** unit:,.{acc}f} {BYTE_UNITS[unit][ntn]}'
+    return size, return_size_str
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-@perf_timer
-def file_read(file_handle, file_blocks):
-    """A simple function to read a part of a file in chunks. It is decorated
-    with a timer to track duration.
+class HashFanout:
+    """An object that passes every update on to one or more hashlibs.
 
-    - Args:
-        - file_handle (file): the open file to read
-        - file_blocks (file): the size in bytes to read
+    This lets --all share one read across every requested hash. hashlib
+    releases the GIL while hashing, so with more than one hash and cpu the
+    updates run on a thread pool and the hashes work on the block at the
+    same time. Each update is timed per hash to keep the hash time and speed
+    output.
 
-    - Returns:
-        - [file]: returns the read blocks
+    - Args:
+        - hlibs (list): (hash name, hashlib) tuples to update
     """
-    return file_handle.read(file_blocks)
+    def __init__(self, hlibs: list):
+        self.hlibs = hlibs
+        # bound update methods, looked up once instead of once per block
+        self.updates = [hlib.update for _, hlib in hlibs]
+        # integer ns hash times line up with hlibs by index
+        self.hash_ns = [0] * len(hlibs)
+        # no point in threads for a single hash or a single cpu
+        workers = min(len(hlibs), os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(workers) if workers > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool:
+            self.pool.shutdown()
+
+    def _timed_update(self, i, upd, data):
+        t_start = perf_counter_ns()
+        upd(data)
+        self.hash_ns[i] += perf_counter_ns() - t_start
+
+    def update(self, data):
+        """Update each hashlib with the same block of data. This waits for
+        every hash to finish so the caller is free to reuse the buffer.
+
+        - Args:
+            - data (bytes-like): the block of the file to hash
+        """
+        if self.pool:
+            futures = [self.pool.submit(self._timed_update, i, upd, data)
+                       for i, upd in enumerate(self.updates)]
+            for future in futures:
+                future.result()
+        else:
+            for i, upd in enumerate(self.updates):
+                self._timed_update(i, upd, data)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-@perf_timer
-def hash_processing(hash_str, hash_action, hlib, file_blocks=0):
-    """This hashes a block of a file (or whole file if small enough). The
-    hashlib must be passed back and forth to maintain a single, consistant
-    hashlib to update for files bigger than the block size. This will also
-    generate a hexadecimal output of a hashlib.
+class ReadAhead:
+    """Iterate over the blocks of a file while a thread reads the next one.
+
+    Two buffers are passed back and forth between the reader thread and the
+    caller: one is filled while the other is hashed, so the disk and the
+    CPU are both kept busy. Each block is yielded as a memoryview that is
+    only valid until the next iteration. The reader thread tracks the time
+    spent reading.
 
     - Args:
-        - hlib (hashlib): the hashlib to update
-        - hash_action (str): either 'update' to runs hashlib.update or 'hex' to
-                             run hashlib.hexdigest.
-        - file_blocks (int, optional): required for hash_action of 'update';
-                                       the data to hash. Defaults to 0.
+        - file_handle (file): the open file to read
+        - block_size (int): the size in bytes of each read
+    """
+    def __init__(self, file_handle, block_size: int):
+        self.file_handle = file_handle
+        self.read_ns = 0
+        # empty buffers go to the reader, filled ones come back to hash
+        self.free = queue.Queue()
+        self.ready = queue.Queue()
+        # the views are made once and a full block is handed out whole
+        for _ in range(2):
+            self.free.put(memoryview(bytearray(block_size)))
+
+    def _reader(self):
+        try:
+            while True:
+                buf = self.free.get()
+                if buf is None:     # the caller stopped early
+                    return
+                t_start = perf_counter_ns()
+                read_size = self.file_handle.readinto(buf)
+                self.read_ns += perf_counter_ns() - t_start
+                self.ready.put((buf, read_size))
+                if not read_size:
+                    return
+        except OSError as e:
+            self.ready.put((e, 0))
+
+    def __iter__(self):
+        thread = threading.Thread(target=self._reader, daemon=True)
+        thread.start()
+        try:
+            while True:
+                buf, read_size = self.ready.get()
+                if isinstance(buf, OSError):
+                    raise buf
+                if not read_size:
+                    break
+                if read_size == len(buf):
+                    yield buf
+                else:
+                    with buf[:read_size] as chunk:
+                        yield chunk
+                self.free.put(buf)
+        finally:
+            self.free.put(None)
+            thread.join()
 
-    - Returns:
-        - [hashlib]: for 'update' hash action, returns an updated hashlib
-                     object,for 'hex' hash action, returns a hexadecimal
-                     string.
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class Progress:
+    """The realtime percent complete line shown with -v. The line is built
+    once with a slot for the percent and written without going through bp,
+    at most about 100 times and only when the shown percent changes.
+
+    - Args:
+        - file_loops (int): the number of blocks the file is read in
+        - source (str): the (shortened) file name to show
+        - verbose (bool): write the progress; otherwise only count blocks
     """
-    # ~~~ #         update section
-    if hash_action == 'update':
-        return hlib.update(file_blocks)
-    # ~~~ #         hex section
-    elif hash_action == 'hex':
-        if 'shake' in hash_str:
-            return hlib.hexdigest(args.length)
+    def __init__(self, file_loops: int, source: str, verbose: bool):
+        self.verbose = verbose
+        self.file_loop = 0
+        # limit cli output to max of 100 loops to prevent slowdown
+        self.update_loop = 1 if file_loops < 100 else file_loops // 100
+        self.inv_loops = 100.0 / file_loops if file_loops else 0.0
+        self.last_pct = -1
+        source = source.replace('%', '%%')
+        if bp_dict['color'] == 1:
+            self.tmpl = (f'\u001b[1000D{Ct.bblue}%d%%{Ct.a} | '
+                         f'{Ct.green}{source}{Ct.a}')
         else:
-            return hlib.hexdigest()
+            self.tmpl = f'\u001b[1000D%d%% | {source}'
+
+    def step(self):
+        """Count one block and write the percent if it changed."""
+        self.file_loop += 1
+        if self.verbose and self.file_loop % self.update_loop == 0:
+            pct = int(self.file_loop * self.inv_loops)
+            if pct != self.last_pct:
+                self.last_pct = pct
+                con_write(self.tmpl % pct, flush=True)
+
+    def finish(self):
+        """Write 100% unless the last block already did, then end the line."""
+        if self.verbose:
+            if self.last_pct == 100:
+                con_write('\n\n')
+            else:
+                con_write(f'{self.tmpl % 100}\n\n')
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def hash_check(h_list: list):
-    """This function reads the file in chunks and executes the hashing
-       algorithm. This tracks the file read times along with the hashing time.
+    """This function reads the file and executes the hashing algorithms.
+       Large files are memory mapped, a single hash of a small file is read
+       in one go, and everything else is read in chunks on a thread while
+       the previous chunk is hashed. This tracks the file read times along
+       with the hashing time.
 
     Args:
         - h (str): this is the type of hash to execute on this function
@@ -492,53 +762,114 @@ def hash_check(h_list: list):
                 else f'...{args.file[(len(args.file) - 60):]}'
             ),
             'read_blocks': args.blocksize * BLOCK_SIZE_FACTOR,
-            'file_size': os.stat(args.file, follow_symlinks=False).st_size,
+            'file_size': 0,
             'file_read_time': 0.0,
             'hash_list': h_list,
             'hash_time': {},
             'hash_hex': {},
         }
-        # this holds one or all of the hashlibs
-        hlib_dict = {}
-        for h in h_list:
-            hlib_dict[h] = getattr(hashlib, h)()
-            hr_dict['hash_time'][h] = 0
-            hr_dict['hash_hex'][h] = ''
-        # loop tracker for realtime progress
-        file_loop = 0
-        # number of loops to execute
-        file_loops = ceil(hr_dict['file_size'] / hr_dict['read_blocks'])
-        # limit cli output to max of 100 loops to prevent slowdown
-        update_loop = 1 if file_loops < 100 else int(file_loops / 100)
+        # this holds one or all of the hashlibs as (name, hashlib) tuples
+        hlibs = [(h, new_hash(h)) for h in h_list]
+        # hexdigest for each hash; variable length ones get --length bound in
+        finalizers = [
+            (h, partial(hl.hexdigest, args.length)
+             if h in XOF_HASHES else hl.hexdigest)
+            for h, hl in hlibs
+        ]
+        # per hash ns timings line up with hlibs by index; seconds at the end
+        hash_ns = [0] * len(hlibs)
+        # progress is only shown with -v
+        verbose = bp_dict['verbose'] >= 1
 
     # ~~~ #                 -file open-
-        with open(hr_dict['file_source'], 'rb') as f:
-            while True:
-                # read source in blocks to prevent potential memory overload
-                f_chunk = file_read(f, hr_dict['read_blocks'])
-                hr_dict['file_read_time'] += f_chunk[1]
-                # this breaks the while loop when file chunk is empty
-                if not f_chunk[2]:
-                    # ensure 100% when complete and add line breaks
-                    bp(['\u001b[1000D100%', Ct.bblue, ' | ', Ct.a,
-                        f'{hr_dict["short_source"]}\n', Ct.green], log=0,
-                        num=0, fil=0, veb=1)
-                    break
-                # send this chunk to be hashed by each algorithm
-                for k, v in hlib_dict.items():
-                    hash_return = hash_processing(k, 'update', v, f_chunk[2])
-                    hr_dict['hash_time'][k] += hash_return[1]
-                # loop increment and output status
-                file_loop += 1
-                if file_loop % update_loop == 0:
-                    bp([f'\u001b[1000D{(file_loop / file_loops) * 100:.0f}%',
-                        Ct.bblue, ' | ', Ct.a, f'{hr_dict["short_source"]}',
-                        Ct.green], log=0, inl=1, num=0, fls=1, fil=0, veb=1)
+        # unbuffered: every path reads in large blocks of its own, so the
+        # BufferedReader would only add a copy
+        with open(hr_dict['file_source'], 'rb', buffering=0) as f:
+            # size the file that was actually opened: a symlink's own size
+            # (or one taken before the open) is not what gets read
+            hr_dict['file_size'] = os.fstat(f.fileno()).st_size
+            # realtime progress, counted per block of the read size
+            progress = Progress(
+                -(-hr_dict['file_size'] // hr_dict['read_blocks']),
+                hr_dict['short_source'],
+                verbose,
+            )
+            # the whole file is read front to back, so ask for big readahead
+            # and for the kernel to start pulling it in right away
+            file_advise(f.fileno(), 'POSIX_FADV_SEQUENTIAL')
+            file_advise(f.fileno(), 'POSIX_FADV_WILLNEED')
+            # ~~~ #             -mmap-
+            # large files are hashed straight from the page cache, no copies
+            mm = None
+            # 32 bit builds can run out of address space mapping big files
+            if hr_dict['file_size'] >= MMAP_MIN_SIZE and sys.maxsize > 2**32:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    # some filesystems and special files can't be mapped, so
+                    # those go through the read paths below
+                    mm = None
+            if mm is not None:
+                # a lone hash with no progress to show takes the whole map in
+                # one update; several hashes share each block while it's hot
+                step = (
+                    len(mm)
+                    if len(hlibs) == 1 and not verbose
+                    else hr_dict['read_blocks']
+                )
+                with mm, HashFanout(hlibs) as fanout:
+                    for advice in ('MADV_SEQUENTIAL', 'MADV_WILLNEED'):
+                        if hasattr(mmap, advice):
+                            mm.madvise(getattr(mmap, advice))
+                    with memoryview(mm) as mm_view:
+                        for offset in range(0, len(mm), step):
+                            with mm_view[offset:offset + step] as chunk:
+                                fanout.update(chunk)
+                            # loop increment and output status
+                            progress.step()
+                hash_ns = fanout.hash_ns
+            # ~~~ #             -single read-
+            # a lone hash of a small file reads it into one file sized buffer,
+            # normally in a single update; reading on to EOF still catches a
+            # file that grew after the fstat. a zero size (/proc and the
+            # like) says nothing about the length, so those use the chunk loop
+            elif len(hlibs) == 1 and 0 < hr_dict['file_size'] < MMAP_MIN_SIZE:
+                buf = memoryview(bytearray(hr_dict['file_size']))
+                update = hlibs[0][1].update
+                read_ns = 0
+                while True:
+                    t_start = perf_counter_ns()
+                    read_size = f.readinto(buf)
+                    t_read = perf_counter_ns()
+                    read_ns += t_read - t_start
+                    if not read_size:
+                        break
+                    update(buf if read_size == len(buf) else buf[:read_size])
+                    hash_ns[0] += perf_counter_ns() - t_read
+                hr_dict['file_read_time'] = read_ns / 1e9
+            # ~~~ #             -chunk loop-
+            # everything else is read in blocks, overlapped with the hashing
+            else:
+                # the next block is read on a thread while this one hashes
+                reader = ReadAhead(f, hr_dict['read_blocks'])
+                with HashFanout(hlibs) as fanout:
+                    for chunk in reader:
+                        # send this chunk to be hashed by each algorithm
+                        fanout.update(chunk)
+                        # loop increment and output status
+                        progress.step()
+                hr_dict['file_read_time'] = reader.read_ns / 1e9
+                hash_ns = fanout.hash_ns
+            # ensure 100% when complete and add line breaks
+            progress.finish()
             # convert hashes into standard hexadecimal notation
-            for k, v in hlib_dict.items():
-                hash_return = hash_processing(k, 'hex', v)
-                hr_dict['hash_time'][k] += hash_return[1]
-                hr_dict['hash_hex'][k] = hash_return[2]
+            for i, (k, finalize) in enumerate(finalizers):
+                t_start = perf_counter_ns()
+                hr_dict['hash_hex'][k] = finalize()
+                hash_ns[i] += perf_counter_ns() - t_start
+            hr_dict['hash_time'] = {
+                h: t / 1e9 for h, t in zip(h_list, hash_ns)
+            }
         return hr_dict
 
     except OSError as e:
@@ -551,33 +882,34 @@ def hash_check(h_list: list):
 def main(h_list: list):
 
     # ~~~ #                 -verbose init-
-    bp([f'Python: v{platform.python_version()} | '
-        f'{platform.python_implementation()} | '
-        f'{platform.python_compiler()}', Ct.a], veb=1, log=0)
-    bp([f'OS: {platform.platform()} | {platform.processor()}', Ct.a], veb=1,
-        log=0)
-    bp(['Args: ', Ct.a], inl=1, veb=1, log=0)
-    for k, v in vars(args).items():
-        if k == 'hash':
-            bp([f'{k}: ', Ct.a, f'{v}', Ct.red, ' | ', Ct.a],
-                num=0, inl=1, veb=1, log=0)
-        elif k == 'compare':
-            bp([f'{k}: {v} | ', Ct.a], num=0, inl=1, veb=1,
-                log=0)
-        else:
-            bp([f'{k}: ', Ct.a, f'{v}', Ct.green, ' | ', Ct.a], inl=1, veb=1,
-                log=0)
-    bp(['\u001b[1D \n', Ct.a], veb=1, log=0, num=0)
+    # platform is slow to import and query, so only touch it for -v
+    if bp_dict['verbose'] >= 1:
+        import platform
+        bp([f'Python: v{platform.python_version()} | '
+            f'{platform.python_implementation()} | '
+            f'{platform.python_compiler()}', Ct.a], veb=1, log=0)
+        bp([f'OS: {platform.platform()} | {platform.processor()}', Ct.a],
+            veb=1, log=0)
+        sha_ni = {True: 'yes', False: 'no', None: 'unknown'}[cpu_has_sha_ni()]
+        bp([f'SHA-NI: {sha_ni}', Ct.a], veb=1, log=0)
+        # one bp call for every arg; num=0 keeps --compare hex values plain
+        arg_line = ' | '.join(f'{k}: {v}' for k, v in vars(args).items())
+        bp([f'Args: {arg_line}\n', Ct.a], num=0, veb=1, log=0)
 
     # ~~~ #                 -hash-
     hash_dict = hash_check(hash_list)
 
     # ~~~ #                 -read output-
     cumulative_time = hash_dict['file_read_time']
-    read_speed = hash_dict["file_size"] / hash_dict['file_read_time']
-    bp([f'Size: {byte_notation(hash_dict["file_size"], ntn=1)[1]} | '
-        f'Read Time: {hash_dict["file_read_time"]:.4f} | '
-        f'Read Speed: {byte_notation(read_speed, ntn=1)[1]}/s', Ct.a])
+    if hash_dict['file_read_time'] > 0:
+        read_speed = hash_dict["file_size"] / hash_dict['file_read_time']
+        bp([f'Size: {byte_notation(hash_dict["file_size"], ntn=1)[1]} | '
+            f'Read Time: {hash_dict["file_read_time"]:.4f} | '
+            f'Read Speed: {byte_notation(read_speed, ntn=1)[1]}/s', Ct.a])
+    else:
+        # mmap reads happen inside the hash update
+        bp([f'Size: {byte_notation(hash_dict["file_size"], ntn=1)[1]} | '
+            'Read Time: included in Hash Time', Ct.a])
 
     # ~~~ #                 -hash output-
     bp(['\nHash:\t\tHash Time:\tHash Speed:\tHex Value:', Ct.a])
@@ -590,6 +922,7 @@ def main(h_list: list):
         cumulative_time += hash_dict["hash_time"][i]
 
     # ~~~ #                 -compare-
+    mismatch = False
     if args.compare:
         bp([f'\nGenerated: {hash_dict["hash_hex"][h_list[0]]}', Ct.a], num=0)
         if hash_dict["hash_hex"][h_list[0]] == args.compare:
@@ -598,6 +931,7 @@ def main(h_list: list):
         else:
             bp([f'Compared:  {args.compare}\n', Ct.a, 'HASHES DO NOT MATCH!!',
                 Ct.red], num=0)
+            mismatch = True
 
     # ~~~ #                 -verbose end-
     end_time = perf_counter()
@@ -607,21 +941,15 @@ def main(h_list: list):
     bp([f'{total_time - cumulative_time:.4f}s - Program Overhead Time', Ct.a],
         veb=1, log=0)
 
+    # ~~~ #                 -exit-
+    # a failed compare exits 1, the same as a compare of the wrong length
+    if mismatch:
+        sys.exit(1)
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 if __name__ == '__main__':
 
-    # ~~~ #             -class variables-
-    Ct = ColorText()
-    Ct.a = '\u001b[0m'
-    Ct.red = '\u001b[38;5;1m'
-    Ct.green = '\u001b[38;5;2m'
-    Ct.yellow = '\u001b[38;5;3m'
-    Ct.bblue = '\u001b[38;5;12m'
-    Ct.bmagenta = '\u001b[38;5;13m'
-    Ct.grey1 = '\u001b[38;5;255m'
-    Ct.orange = '\u001b[38;2;233;133;33m'
-
     # ~~~ #             -args-
     args = get_args()
 
@@ -631,6 +959,8 @@ if __name__ == '__main__':
     # ~~~ #             -variables-
     hash_list = hash_list if args.all else [args.hash]
     bp_dict['verbose'] = args.verbose
+    if args.no_color:
+        bp_dict['color'] = 0
 
     # ~~~ #             -title-
     bp([f'{ver}: {__purpose__}\n', Ct.bblue])